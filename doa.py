@@ -15,22 +15,71 @@ Features:
 =================================================================
 """
 
-import json, os, re
+import collections, functools, heapq, json, math, os, re, sys, threading, time
 import requests
+from requests.adapters import HTTPAdapter
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
+import orjson
 import pytz
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from Sastrawi.Dictionary.ArrayDictionary import ArrayDictionary
+from Sastrawi.Stemmer.Cache.ArrayCache import ArrayCache
+from Sastrawi.Stemmer.CachedStemmer import CachedStemmer
+from Sastrawi.Stemmer.Stemmer import Stemmer
 from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
 
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider using orjson, so jsonify() skips the stdlib encoder"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand the encoded bytes straight to the response (no str round-trip)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default), mimetype=self.mimetype
+        )
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 DOA_FILE = "doa_dataset.json"
 HADIS_FILE = "hadist_dataset.json"
 INTENT_FILE = "intent_rules.json"
 
-stemmer = StemmerFactory().create_stemmer()
+# ================= STEMMER =================
+class SetDictionary(ArrayDictionary):
+    """
+    Sastrawi's ArrayDictionary checks words against a ~30k item list, so
+    every dictionary lookup in the stemmer is a linear scan. Same
+    dictionary, backed by a set.
+    """
+    def __init__(self, words=None):
+        self.word_set = set()
+        super().__init__(words)
+    
+    def contains(self, word):
+        return word in self.word_set
+    
+    def add(self, word):
+        super().add(word)
+        if word and word.strip() != '':
+            self.word_set.add(word)
+
+def create_stemmer():
+    """Same stemmer as StemmerFactory().create_stemmer(), with O(1) dictionary lookups"""
+    dictionary = SetDictionary(StemmerFactory().get_words())
+    return CachedStemmer(ArrayCache(), Stemmer(dictionary))
+
+stemmer = create_stemmer()
 
 # ================= LOAD DATA =================
 def load_json(path):
@@ -39,10 +88,6 @@ def load_json(path):
     with open(path, encoding="utf-8") as f:
         return json.load(f)
 
-DOA_DATA = load_json(DOA_FILE)
-HADIS_DATA = load_json(HADIS_FILE)
-INTENTS = load_json(INTENT_FILE)
-
 # ================= STOPWORDS (Indonesian) =================
 STOPWORDS = {
     'yang', 'untuk', 'pada', 'adalah', 'dari', 'di', 'ke', 'dalam',
@@ -52,68 +97,232 @@ STOPWORDS = {
 }
 
 # ================= NLP FUNCTIONS =================
+_RE_WS = re.compile(r"\s+")
+_RE_NONALNUM = re.compile(r"[^a-z0-9\s]")
+
 def normalize(text):
     """Normalize text: lowercase, remove extra spaces"""
-    return re.sub(r"\s+", " ", text.lower().strip())
+    return _RE_WS.sub(" ", text.lower().strip())
 
+@functools.lru_cache(maxsize=8192)
 def preprocess(text):
-    """Clean and stem text"""
+    """Clean and stem text (memoized - the stemmer is the hot spot)"""
     # Remove special chars, keep letters and numbers
-    text = re.sub(r"[^a-z0-9\s]", "", text.lower())
+    text = _RE_NONALNUM.sub("", text.lower())
     # Stem
     text = stemmer.stem(text)
     return text
 
+@functools.lru_cache(maxsize=8192)
 def get_keywords(text):
-    """Extract meaningful keywords from text"""
+    """Extract meaningful keywords from text (as a tuple, so it can be cached)"""
     words = preprocess(text).split()
-    # Remove stopwords and single characters
-    keywords = [w for w in words if len(w) > 1 and w not in STOPWORDS]
+    # Remove stopwords and single characters; intern so vocabulary
+    # lookups can match on identity
+    keywords = tuple(sys.intern(w) for w in words if len(w) > 1 and w not in STOPWORDS)
     return keywords
 
+# ================= SEARCH INDEX =================
+def encode_tokens(tokens, vocab):
+    """Map tokens to vocabulary ids, adding unseen tokens to the vocabulary"""
+    return frozenset(vocab.setdefault(sys.intern(token), len(vocab)) for token in tokens)
+
+def build_index(entries, vocab, searchables, keyword_lists=None):
+    """
+    Preprocess entries once so searches don't re-stem them per query.
+    Stored column-wise: index[field][i] describes entries[i].
+    """
+    index = {
+        "raw": entries,
+        "searchable_stemmed": [],
+        "tokens": [],
+        "kw_tokens": []
+    }
+    
+    for i, searchable in enumerate(searchables):
+        searchable_stemmed = preprocess(searchable)
+        kw_tokens = set()
+        for kw in (keyword_lists[i] if keyword_lists else []):
+            kw_tokens.update(get_keywords(kw))
+        
+        index["searchable_stemmed"].append(searchable_stemmed)
+        index["tokens"].append(encode_tokens(searchable_stemmed.split(), vocab))
+        index["kw_tokens"].append(encode_tokens(kw_tokens, vocab))
+    
+    return index
+
+def build_doa_index(doa_data, vocab):
+    return build_index(
+        doa_data, vocab,
+        [f"{doa['judul']} {doa['arti']} {doa.get('latin', '')}" for doa in doa_data]
+    )
+
+def build_hadis_index(hadis_data, vocab):
+    return build_index(
+        hadis_data, vocab,
+        [f"{hadis['tema']} {hadis['arti']}" for hadis in hadis_data],
+        [hadis.get('kata_kunci', []) for hadis in hadis_data]
+    )
+
+def build_postings(index, field):
+    """Inverted index: token id -> list of entry positions containing it"""
+    postings = {}
+    for i, tokens in enumerate(index[field]):
+        for token in tokens:
+            postings.setdefault(token, []).append(i)
+    return postings
+
+def build_substring_trie(tokens):
+    """
+    Suffix trie over the vocabulary: every suffix of every token is
+    inserted, so walking any string from the root ends at a node whose
+    "ids" are the tokens containing that string. "token" marks nodes whose
+    path is a whole vocabulary token.
+    """
+    root = {"children": {}, "ids": set(), "token": None}
+    for i, token in enumerate(tokens):
+        for start in range(len(token)):
+            node = root
+            for ch in token[start:]:
+                child = node["children"].get(ch)
+                if child is None:
+                    child = node["children"][ch] = {"children": {}, "ids": set(), "token": None}
+                node = child
+                node["ids"].add(i)
+            if start == 0:
+                node["token"] = i
+    return root
+
+@functools.lru_cache(maxsize=4096)
+def containing_tokens(word):
+    """Ids of vocabulary tokens that contain word"""
+    node = SUBSTRING_TRIE
+    for ch in word:
+        node = node["children"].get(ch)
+        if node is None:
+            return frozenset()
+    return frozenset(node["ids"])
+
+@functools.lru_cache(maxsize=4096)
+def partial_neighbors(word):
+    """Ids of 4+ char vocabulary tokens that contain word or are contained in it"""
+    if len(word) < 4:
+        return frozenset()
+    
+    neighbors = set(containing_tokens(word))
+    
+    # Tokens inside word end on a whole-token node when walking from some offset
+    for start in range(len(word) - 3):
+        node = SUBSTRING_TRIE
+        for depth, ch in enumerate(word[start:], 1):
+            node = node["children"].get(ch)
+            if node is None:
+                break
+            if depth >= 4 and node["token"] is not None:
+                neighbors.add(node["token"])
+    
+    return frozenset(neighbors)
+
+def load_datasets():
+    """
+    Load datasets from disk and build everything derived from them.
+    Nothing global is touched here; reload_datasets() publishes the result.
+    """
+    doa_data = load_json(DOA_FILE)
+    hadis_data = load_json(HADIS_FILE)
+    intents = load_json(INTENT_FILE)
+    
+    if not isinstance(doa_data, list) or not isinstance(hadis_data, list):
+        raise ValueError(f"{DOA_FILE} and {HADIS_FILE} must contain a JSON list")
+    if not isinstance(intents, dict):
+        raise ValueError(f"{INTENT_FILE} must contain a JSON object")
+    
+    # Tag entries once here instead of copying them per search result
+    for doa in doa_data:
+        doa["source_type"] = "doa"
+    for hadis in hadis_data:
+        hadis["source_type"] = "hadis"
+    
+    # Stemmed tokens are stored as small int ids shared by both datasets
+    vocab = {}
+    doa_index = build_doa_index(doa_data, vocab)
+    hadis_index = build_hadis_index(hadis_data, vocab)
+    vocab_tokens = list(vocab)
+    
+    # Lowercased and stemmed forms of every intent keyword, computed once
+    for intent_data in intents.values():
+        intent_data["_lower_keywords"] = [kw.lower() for kw in intent_data["keywords"]]
+        intent_data["_stemmed_kw_sets"] = [
+            frozenset(get_keywords(kw)) for kw in intent_data["keywords"]
+        ]
+    
+    return {
+        "doa_data": doa_data,
+        "hadis_data": hadis_data,
+        "intents": intents,
+        "vocab": vocab,
+        "vocab_tokens": vocab_tokens,
+        "substring_trie": build_substring_trie(vocab_tokens),
+        "doa_index": doa_index,
+        "hadis_index": hadis_index,
+        "doa_postings": build_postings(doa_index, "tokens"),
+        "hadis_postings": build_postings(hadis_index, "tokens"),
+        "hadis_kw_postings": build_postings(hadis_index, "kw_tokens"),
+        # Distinct lowercased intent keywords, each tested against a query once
+        "intent_phrases": frozenset(
+            kw_lower
+            for intent_data in intents.values()
+            for kw_lower in intent_data["_lower_keywords"]
+        )
+    }
+
 # ================= SMART MATCHING =================
-def calculate_match_score(query_keywords, target_text, target_keywords=None):
+def prepare_query(query_keywords):
+    """Encode query keywords against the vocabulary once per search"""
+    query_set = frozenset(query_keywords)
+    return {
+        "words": query_set,
+        "ids": frozenset(VOCAB[w] for w in query_set if w in VOCAB),
+        "partials": [partial_neighbors(w) for w in query_set],
+        "phrase": " ".join(query_keywords)
+    }
+
+def calculate_match_score(query, target_words, target_stemmed, target_kw_set=None):
     """
     Calculate match score using multiple signals:
     1. Word overlap in main text
     2. Keyword match bonus
     3. Exact phrase match bonus
     4. Partial match consideration
+    
+    query comes from prepare_query; target_words, target_stemmed and
+    target_kw_set come precomputed from the search index (see build_index).
     """
-    target_words = set(preprocess(target_text).split())
-    query_set = set(query_keywords)
+    query_ids = query["ids"]
     
     # Base score: word overlap
-    overlap = len(query_set & target_words)
-    if len(query_set) == 0:
+    overlap = len(query_ids & target_words)
+    if len(query["words"]) == 0:
         return 0.0
     
-    base_score = overlap / len(query_set)
+    base_score = overlap / len(query["words"])
     
     # Bonus for keyword matches
     keyword_bonus = 0.0
-    if target_keywords:
-        target_kw_set = set()
-        for kw in target_keywords:
-            target_kw_set.update(get_keywords(kw))
-        
-        kw_overlap = len(query_set & target_kw_set)
+    if target_kw_set:
+        kw_overlap = len(query_ids & target_kw_set)
         keyword_bonus = kw_overlap * 0.2  # Each keyword match adds 0.2
     
     # Bonus for exact phrase match
     phrase_bonus = 0.0
-    original_query = " ".join(query_keywords)
-    if original_query in preprocess(target_text):
+    if query["phrase"] in target_stemmed:
         phrase_bonus = 0.3
     
     # Partial word match bonus (for words like "sabar" matching "kesabaran")
     partial_bonus = 0.0
-    for qw in query_set:
-        for tw in target_words:
-            if len(qw) >= 4 and len(tw) >= 4:  # Only for words 4+ chars
-                if qw in tw or tw in qw:
-                    partial_bonus += 0.1
-                    break
+    for neighbors in query["partials"]:
+        if not neighbors.isdisjoint(target_words):
+            partial_bonus += 0.1
     
     total_score = min(base_score + keyword_bonus + phrase_bonus + partial_bonus, 1.0)
     return round(total_score, 3)
@@ -125,7 +334,10 @@ def detect_intent(query):
     Returns: dict with intent info or None
     """
     query_lower = query.lower()
-    query_keywords = set(get_keywords(query))
+    query_keywords = frozenset(get_keywords(query))
+    
+    # One pass over all intent keywords for exact (substring) matches
+    found_phrases = {phrase for phrase in INTENT_PHRASES if phrase in query_lower}
     
     best_intent = None
     best_score = 0
@@ -134,15 +346,17 @@ def detect_intent(query):
         score = 0
         matched_kws = []
         
-        for keyword in intent_data["keywords"]:
-            kw_lower = keyword.lower()
-            
+        for keyword, kw_lower, kw_stems in zip(
+            intent_data["keywords"],
+            intent_data["_lower_keywords"],
+            intent_data["_stemmed_kw_sets"]
+        ):
             # Exact match in original query (highest priority)
-            if kw_lower in query_lower:
+            if kw_lower in found_phrases:
                 score += 1.0
                 matched_kws.append(keyword)
             # Stemmed keyword match
-            elif any(kw_word in query_keywords for kw_word in get_keywords(keyword)):
+            elif not query_keywords.isdisjoint(kw_stems):
                 score += 0.5
                 matched_kws.append(keyword)
         
@@ -162,77 +376,129 @@ def detect_intent(query):
     return None
 
 # ================= SEARCH FUNCTIONS =================
+def find_candidates(query, postings, kw_postings=None):
+    """
+    Positions of entries that can score above zero for the query.
+    Besides exact token hits this includes tokens that contain a query
+    word (phrase bonus) or overlap it as a 4+ char substring (partial bonus).
+    """
+    candidates = set()
+    
+    for qw in query["words"]:
+        if kw_postings and VOCAB.get(qw) in kw_postings:
+            candidates.update(kw_postings[VOCAB[qw]])
+        
+        for token in containing_tokens(qw) | partial_neighbors(qw):
+            candidates.update(postings.get(token, ()))
+    
+    # Keep dataset order so ties sort the same way as a full scan
+    return sorted(candidates)
+
 def search_doa(query_keywords, top_k=10):
     """Search doa dataset - stricter scoring for quality"""
     results = []
+    query = prepare_query(query_keywords)
+    raw = DOA_INDEX["raw"]
+    tokens = DOA_INDEX["tokens"]
+    stemmed = DOA_INDEX["searchable_stemmed"]
     
-    for doa in DOA_DATA:
-        # Combine searchable fields
-        searchable = f"{doa['judul']} {doa['arti']} {doa.get('latin', '')}"
-        
-        score = calculate_match_score(query_keywords, searchable)
+    for i in find_candidates(query, DOA_POSTINGS):
+        score = calculate_match_score(query, tokens[i], stemmed[i])
         
         # ✅ Higher threshold for doa (only very relevant ones)
         if score > 0.2:
             results.append({
                 "score": float(score),
-                "data": {**doa, "source_type": "doa"}
+                "data": raw[i]
             })
     
-    return sorted(results, key=lambda x: x["score"], reverse=True)[:top_k]
+    return heapq.nlargest(top_k, results, key=lambda x: x["score"])
 
 def search_hadis(query_keywords, top_k=10):
     """Search hadis dataset - more lenient for variety"""
     results = []
+    query = prepare_query(query_keywords)
+    raw = HADIS_INDEX["raw"]
+    tokens = HADIS_INDEX["tokens"]
+    stemmed = HADIS_INDEX["searchable_stemmed"]
+    kw_tokens = HADIS_INDEX["kw_tokens"]
     
-    for hadis in HADIS_DATA:
-        # Combine searchable fields
-        searchable = f"{hadis['tema']} {hadis['arti']}"
-        kata_kunci = hadis.get('kata_kunci', [])
-        
-        score = calculate_match_score(query_keywords, searchable, kata_kunci)
+    for i in find_candidates(query, HADIS_POSTINGS, HADIS_KW_POSTINGS):
+        score = calculate_match_score(query, tokens[i], stemmed[i], kw_tokens[i])
         
         # ✅ Lower threshold for hadis (show more variety)
         if score > 0.05:
             results.append({
                 "score": float(score),
-                "data": {**hadis, "source_type": "hadis"}
+                "data": raw[i]
             })
     
-    return sorted(results, key=lambda x: x["score"], reverse=True)[:top_k]
+    return heapq.nlargest(top_k, results, key=lambda x: x["score"])
 
 # ================= DEDUPLICATION =================
 def deduplicate_by_id(results):
-    """Remove duplicates based on ID field"""
-    seen_ids = set()
-    unique = []
+    """Remove duplicates based on ID field, keeping the highest-scoring copy"""
+    best = {}
     
     for result in results:
         item_id = result["data"].get("id")
-        if item_id and item_id not in seen_ids:
-            seen_ids.add(item_id)
-            unique.append(result)
+        if not item_id:
+            continue
+        current = best.get(item_id)
+        if current is None or result["score"] > current["score"]:
+            best[item_id] = result
     
-    return unique
+    return list(best.values())
 
 # ================= RESPONSE FORMATTING =================
+NO_RESULTS_RESPONSE = {
+    "status": "ASK",
+    "message": "Maaf, belum menemukan hasil yang sesuai 😔\n\nCoba dengan kata kunci lain ya!",
+    "suggestions": [
+        "Gunakan kata kunci lebih spesifik",
+        "Contoh: 'doa sebelum makan', 'hadis tentang sabar'"
+    ],
+    "examples": [
+        "doa keluar rumah",
+        "hadis tentang ilmu",
+        "doa untuk orang sakit"
+    ]
+}
+
+EMPTY_QUERY_RESPONSE = {
+    "status": "ASK",
+    "message": "Silakan ketik kebutuhan doa atau hadis 😊",
+    "examples": [
+        "doa sebelum makan",
+        "hadis tentang sabar",
+        "doa naik kendaraan"
+    ]
+}
+
+TOO_GENERAL_RESPONSE = {
+    "status": "ASK",
+    "message": "Kata kunci terlalu umum. Coba lebih spesifik ya! 😊",
+    "examples": [
+        "doa sebelum tidur",
+        "hadis tentang akhlak",
+        "doa memohon rezeki"
+    ]
+}
+
+GREETING_EXAMPLES = [
+    "doa keluar rumah",
+    "hadis tentang ilmu",
+    "doa ketika sakit"
+]
+
+GREETINGS = frozenset({"halo", "hai", "mulai", "assalamualaikum", "salam", "test", "tes"})
+SALAM_GREETINGS = frozenset({"assalamualaikum", "salam"})
+
 def format_response(results, query, intent=None):
     """Format chatbot response with helpful context"""
     
     if not results:
-        return {
-            "status": "ASK",
-            "message": "Maaf, belum menemukan hasil yang sesuai 😔\n\nCoba dengan kata kunci lain ya!",
-            "suggestions": [
-                "Gunakan kata kunci lebih spesifik",
-                "Contoh: 'doa sebelum makan', 'hadis tentang sabar'"
-            ],
-            "examples": [
-                "doa keluar rumah",
-                "hadis tentang ilmu",
-                "doa untuk orang sakit"
-            ]
-        }
+        return NO_RESULTS_RESPONSE
     
     # Separate by type
     doa_results = [r for r in results if r["data"]["source_type"] == "doa"]
@@ -286,21 +552,59 @@ def format_response(results, query, intent=None):
     }
 
 # ================= TIME-BASED GREETING (OFFLINE-SAFE) =================
+# Shared session: keep-alive connections to Aladhan are reused across requests
+_HTTP = requests.Session()
+_HTTP.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+@functools.lru_cache(maxsize=1024)
+def _resolve_timezone(lat, lng):
+    """
+    Timezone name for a location via Aladhan API.
+    Cached per location; failures raise, so they are not cached.
+    """
+    url = f'https://api.aladhan.com/v1/timings?latitude={lat}&longitude={lng}&method=11'
+    response = _HTTP.get(url, timeout=3)  # ✅ SHORT TIMEOUT
+    response.raise_for_status()
+    return response.json()['data']['meta']['timezone']
+
+# Buckets whose lookup failed recently -> time.monotonic() of the failure.
+# While Aladhan is unreachable this keeps greetings from waiting out the
+# timeout on every request; they use the default timezone instead
+_TZ_FAILED_AT = {}
+_TZ_RETRY_SECONDS = 60
+_TZ_FAILED_MAX = 1024
+
+def _timezone_failed_recently(bucket):
+    failed_at = _TZ_FAILED_AT.get(bucket)
+    return failed_at is not None and time.monotonic() - failed_at < _TZ_RETRY_SECONDS
+
+def _remember_timezone_failure(bucket):
+    now = time.monotonic()
+    if len(_TZ_FAILED_AT) >= _TZ_FAILED_MAX:
+        for key, failed_at in list(_TZ_FAILED_AT.items()):
+            if now - failed_at >= _TZ_RETRY_SECONDS:
+                _TZ_FAILED_AT.pop(key, None)
+    if len(_TZ_FAILED_AT) < _TZ_FAILED_MAX:
+        _TZ_FAILED_AT[bucket] = now
+
 def get_time_based_greeting(lat=None, lng=None):
     """Get greeting based on current time in user's location"""
     timezone_name = 'Asia/Jakarta'  # Default to Jakarta
     
     # ✅ OFFLINE-SAFE: Try to get timezone, but don't block if it fails
     if lat is not None and lng is not None:
+        # Round to 0.5° so nearby users share one cached lookup
         try:
-            url = f'https://api.aladhan.com/v1/timings?latitude={lat}&longitude={lng}&method=11'
-            response = requests.get(url, timeout=3)  # ✅ SHORT TIMEOUT
-            if response.status_code == 200:
-                data = response.json()
-                timezone_name = data['data']['meta']['timezone']
-        except Exception as e:
-            print(f"⚠️ Timezone fetch failed (offline?): {str(e)}")
-            # Fallback to default - no problem!
+            bucket = (round(float(lat) * 2) / 2, round(float(lng) * 2) / 2)
+        except (TypeError, ValueError, OverflowError):
+            bucket = None
+        if bucket is not None and not _timezone_failed_recently(bucket):
+            try:
+                timezone_name = _resolve_timezone(*bucket)
+            except Exception as e:
+                print(f"⚠️ Timezone fetch failed (offline?): {str(e)}")
+                # Fallback to default and skip this bucket for a while
+                _remember_timezone_failure(bucket)
     
     try:
         tz = pytz.timezone(timezone_name)
@@ -318,88 +622,133 @@ def get_time_based_greeting(lat=None, lng=None):
         print(f"⚠️ Time greeting failed: {str(e)}")
         return "Selamat datang"
 
+# ================= CHAT PIPELINE =================
+@functools.lru_cache(maxsize=512)
+def _compute_chat_response(query):
+    """
+    Keyword extraction, intent detection and search for a normalized query.
+    Cached per query, so the returned dict is shared and must not be mutated.
+    """
+    # Extract keywords
+    query_keywords = get_keywords(query)
+    
+    if not query_keywords:
+        return TOO_GENERAL_RESPONSE
+    
+    # Detect intent
+    intent = detect_intent(query)
+    
+    results = []
+    
+    # Intent-based search (if strong intent detected)
+    if intent and intent["score"] >= 1.0:
+        canonical_keywords = get_keywords(intent["canonical_query"])
+        
+        if intent["type"] == "doa":
+            # For doa intent: get top 2 doa + more hadis
+            doa_res = search_doa(canonical_keywords, top_k=5)
+            hadis_res = search_hadis(query_keywords, top_k=10)
+            results = doa_res + hadis_res
+        else:
+            # For hadis intent: prioritize hadis but add some doa
+            hadis_res = search_hadis(canonical_keywords, top_k=10)
+            doa_res = search_doa(query_keywords, top_k=3)
+            results = hadis_res + doa_res
+    
+    # General search (no strong intent or need more results)
+    if not results or len(results) < 3:
+        # ✅ Get more hadis than doa for variety
+        doa_results = search_doa(query_keywords, top_k=5)
+        hadis_results = search_hadis(query_keywords, top_k=15)
+        results = doa_results + hadis_results
+    
+    # Deduplicate and re-sort
+    results = deduplicate_by_id(results)
+    results = sorted(results, key=lambda x: x["score"], reverse=True)
+    
+    return format_response(results, query, intent)
+
+# Normalized queries known to find nothing (bounded LRU, cleared on reload).
+# The dev server is threaded, so every access goes through the lock
+_EMPTY_QUERY_CACHE = collections.OrderedDict()
+_EMPTY_QUERY_CACHE_SIZE = 256
+_EMPTY_QUERY_LOCK = threading.Lock()
+
+def is_known_empty_query(query):
+    with _EMPTY_QUERY_LOCK:
+        if query not in _EMPTY_QUERY_CACHE:
+            return False
+        _EMPTY_QUERY_CACHE.move_to_end(query)
+        return True
+
+def remember_empty_query(query):
+    with _EMPTY_QUERY_LOCK:
+        _EMPTY_QUERY_CACHE[query] = True
+        _EMPTY_QUERY_CACHE.move_to_end(query)
+        if len(_EMPTY_QUERY_CACHE) > _EMPTY_QUERY_CACHE_SIZE:
+            _EMPTY_QUERY_CACHE.popitem(last=False)
+
 # ================= MAIN CHAT ENDPOINT =================
+@dataclass(slots=True)
+class QueryCtx:
+    """Parsed /chat request"""
+    query: str
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+
+def parse_coordinate(value):
+    """Coordinate from the request body as a float, or None if missing or invalid"""
+    try:
+        coordinate = float(value)
+    except (TypeError, ValueError):
+        return None
+    return coordinate if math.isfinite(coordinate) else None
+
+def parse_request(req):
+    """Read the chat request body into a QueryCtx with a normalized query"""
+    data = req.get_json(force=True)
+    return QueryCtx(
+        query=normalize(data.get("query", "")),
+        lat=parse_coordinate(data.get("lat")),
+        lng=parse_coordinate(data.get("lng"))
+    )
+
+def handle_greeting(ctx):
+    """Greeting reply if the query is a greeting, else None"""
+    if ctx.query not in GREETINGS:
+        return None
+    
+    time_greeting = get_time_based_greeting(ctx.lat, ctx.lng)
+    salam = "Wa'alaikumsalam" if ctx.query in SALAM_GREETINGS else "Halo"
+    return {
+        "status": "ASK",
+        "message": f"{salam}, {time_greeting} 😊\n\nSaya Asisten Islami. Silakan tanyakan doa atau hadis yang kamu butuhkan!",
+        "examples": GREETING_EXAMPLES
+    }
+
 @app.route("/chat", methods=["POST"])
 def chat():
     try:
-        data = request.get_json(force=True)
-        query = normalize(data.get("query", ""))
-        lat = data.get("lat")
-        lng = data.get("lng")
+        ctx = parse_request(request)
         
         # Empty query
-        if not query:
-            return jsonify({
-                "status": "ASK",
-                "message": "Silakan ketik kebutuhan doa atau hadis 😊",
-                "examples": [
-                    "doa sebelum makan",
-                    "hadis tentang sabar",
-                    "doa naik kendaraan"
-                ]
-            })
-        
-        # Greetings
-        greetings = ["halo", "hai", "mulai", "assalamualaikum", "salam", "test", "tes"]
-        if query in greetings:
-            time_greeting = get_time_based_greeting(lat, lng)
-            salam = "Wa'alaikumsalam" if query in ["assalamualaikum", "salam"] else "Halo"
-            return jsonify({
-                "status": "ASK",
-                "message": f"{salam}, {time_greeting} 😊\n\nSaya Asisten Islami. Silakan tanyakan doa atau hadis yang kamu butuhkan!",
-                "examples": [
-                    "doa keluar rumah",
-                    "hadis tentang ilmu",
-                    "doa ketika sakit"
-                ]
-            })
-        
-        # Extract keywords
-        query_keywords = get_keywords(query)
-        
-        if not query_keywords:
-            return jsonify({
-                "status": "ASK",
-                "message": "Kata kunci terlalu umum. Coba lebih spesifik ya! 😊",
-                "examples": [
-                    "doa sebelum tidur",
-                    "hadis tentang akhlak",
-                    "doa memohon rezeki"
-                ]
-            })
-        
-        # Detect intent
-        intent = detect_intent(query)
-        
-        results = []
+        if not ctx.query:
+            return jsonify(EMPTY_QUERY_RESPONSE)
         
-        # Intent-based search (if strong intent detected)
-        if intent and intent["score"] >= 1.0:
-            canonical_keywords = get_keywords(intent["canonical_query"])
-            
-            if intent["type"] == "doa":
-                # For doa intent: get top 2 doa + more hadis
-                doa_res = search_doa(canonical_keywords, top_k=5)
-                hadis_res = search_hadis(query_keywords, top_k=10)
-                results = doa_res + hadis_res
-            else:
-                # For hadis intent: prioritize hadis but add some doa
-                hadis_res = search_hadis(canonical_keywords, top_k=10)
-                doa_res = search_doa(query_keywords, top_k=3)
-                results = hadis_res + doa_res
+        # Greetings (depend on time and location, so never cached)
+        greeting = handle_greeting(ctx)
+        if greeting:
+            return jsonify(greeting)
         
-        # General search (no strong intent or need more results)
-        if not results or len(results) < 3:
-            # ✅ Get more hadis than doa for variety
-            doa_results = search_doa(query_keywords, top_k=5)
-            hadis_results = search_hadis(query_keywords, top_k=15)
-            results = doa_results + hadis_results
+        # Known zero-match query: skip the pipeline entirely
+        if is_known_empty_query(ctx.query):
+            return jsonify(NO_RESULTS_RESPONSE)
         
-        # Deduplicate and re-sort
-        results = deduplicate_by_id(results)
-        results = sorted(results, key=lambda x: x["score"], reverse=True)
+        response = _compute_chat_response(ctx.query)
+        if response is NO_RESULTS_RESPONSE:
+            remember_empty_query(ctx.query)
         
-        return jsonify(format_response(results, query, intent))
+        return jsonify(response)
     
     except Exception as e:
         print(f"❌ Error in /chat: {str(e)}")
@@ -408,78 +757,63 @@ def chat():
             "message": "Maaf, terjadi kesalahan server 😔"
         }), 500
 
-# ================= SUGGESTION ENDPOINT =================
-@app.route("/suggest", methods=["GET"])
-def suggest():
-    """Get popular suggestions"""
-    return jsonify({
-        "status": "OK",
-        "categories": {
-            "doa_populer": [
-                "Doa Sebelum Makan",
-                "Doa Naik Kendaraan",
-                "Doa Sebelum Tidur",
-                "Doa Ketika Sakit",
-                "Doa Keluar Rumah"
-            ],
-            "hadis_populer": [
-                "Hadis tentang Akhlak",
-                "Hadis tentang Ilmu",
-                "Hadis tentang Sabar",
-                "Hadis tentang Sosial",
-                "Hadis tentang Ibadah"
-            ]
-        },
-        "quick_searches": [
-            "doa pagi",
-            "doa malam",
-            "hadis sabar",
-            "doa rezeki",
-            "hadis berbuat baik"
+# ================= PREBUILT RESPONSES =================
+# /suggest, /browse and /health only depend on the loaded datasets, so
+# their JSON is encoded once (and again on reload) instead of per request
+SUGGESTIONS = {
+    "status": "OK",
+    "categories": {
+        "doa_populer": [
+            "Doa Sebelum Makan",
+            "Doa Naik Kendaraan",
+            "Doa Sebelum Tidur",
+            "Doa Ketika Sakit",
+            "Doa Keluar Rumah"
+        ],
+        "hadis_populer": [
+            "Hadis tentang Akhlak",
+            "Hadis tentang Ilmu",
+            "Hadis tentang Sabar",
+            "Hadis tentang Sosial",
+            "Hadis tentang Ibadah"
         ]
-    })
-
-# ================= BROWSE ENDPOINT =================
-@app.route("/browse/<category>", methods=["GET"])
-def browse(category):
-    """Browse doa or hadis by category"""
-    try:
-        if category == "doa":
-            return jsonify({
-                "status": "OK",
-                "category": "doa",
-                "total": len(DOA_DATA),
-                "data": [{"data": {**d, "source_type": "doa"}, "score": 1.0} for d in DOA_DATA]
-            })
-        elif category == "hadis":
-            return jsonify({
-                "status": "OK",
-                "category": "hadis",
-                "total": len(HADIS_DATA),
-                "data": [{"data": {**h, "source_type": "hadis"}, "score": 1.0} for h in HADIS_DATA]
-            })
-        else:
-            return jsonify({
-                "status": "ERROR",
-                "message": "Kategori tidak valid. Gunakan 'doa' atau 'hadis'."
-            }), 400
-    except Exception as e:
-        return jsonify({
-            "status": "ERROR",
-            "message": str(e)
-        }), 500
+    },
+    "quick_searches": [
+        "doa pagi",
+        "doa malam",
+        "hadis sabar",
+        "doa rezeki",
+        "hadis berbuat baik"
+    ]
+}
 
-# ================= HEALTH CHECK =================
-@app.route("/health", methods=["GET"])
-def health():
-    return jsonify({
+def build_static_responses(doa_data, hadis_data, intents):
+    """Encode the data-only /suggest, /browse and /health responses"""
+    suggest_bytes = orjson.dumps(SUGGESTIONS)
+    
+    browse_bytes = {
+        "doa": orjson.dumps({
+            "status": "OK",
+            "category": "doa",
+            "total": len(doa_data),
+            "data": [{"data": d, "score": 1.0} for d in doa_data]
+        }),
+        "hadis": orjson.dumps({
+            "status": "OK",
+            "category": "hadis",
+            "total": len(hadis_data),
+            "data": [{"data": h, "score": 1.0} for h in hadis_data]
+        })
+    }
+    
+    health_bytes = orjson.dumps({
         "status": "OK",
         "service": "Islamic Chatbot API",
         "version": "2.1",
         "data_stats": {
-            "doa_count": len(DOA_DATA),
-            "hadis_count": len(HADIS_DATA),
-            "intents": list(INTENTS.keys())
+            "doa_count": len(doa_data),
+            "hadis_count": len(hadis_data),
+            "intents": list(intents.keys())
         },
         "features": {
             "max_results_per_query": "2 doa + 3 hadis (total 5)",
@@ -487,6 +821,79 @@ def health():
             "timeout_seconds": 3
         }
     })
+    
+    return suggest_bytes, browse_bytes, health_bytes
+
+def json_bytes_response(body):
+    """Response for JSON that is already encoded"""
+    return app.response_class(body, mimetype="application/json")
+
+# ================= SUGGESTION ENDPOINT =================
+@app.route("/suggest", methods=["GET"])
+def suggest():
+    """Get popular suggestions"""
+    return json_bytes_response(SUGGEST_BYTES)
+
+# ================= BROWSE ENDPOINT =================
+@app.route("/browse/<category>", methods=["GET"])
+def browse(category):
+    """Browse doa or hadis by category"""
+    if category in BROWSE_BYTES:
+        return json_bytes_response(BROWSE_BYTES[category])
+    
+    return jsonify({
+        "status": "ERROR",
+        "message": "Kategori tidak valid. Gunakan 'doa' atau 'hadis'."
+    }), 400
+
+# ================= DATA LOADING =================
+def reload_datasets():
+    """
+    (Re)load datasets and drop responses cached from the old data.
+    Everything is built first and published in one step, so a failed
+    reload raises and leaves the previous data in place.
+    
+    Only affects the calling process. Under gunicorn each worker holds its
+    own copy, so data changes are deployed by restarting the service.
+    """
+    global DOA_DATA, HADIS_DATA, INTENTS
+    global VOCAB, VOCAB_TOKENS, SUBSTRING_TRIE, DOA_INDEX, HADIS_INDEX
+    global DOA_POSTINGS, HADIS_POSTINGS, HADIS_KW_POSTINGS
+    global INTENT_PHRASES, SUGGEST_BYTES, BROWSE_BYTES, HEALTH_BYTES
+    
+    data = load_datasets()
+    static = build_static_responses(data["doa_data"], data["hadis_data"], data["intents"])
+    
+    DOA_DATA = data["doa_data"]
+    HADIS_DATA = data["hadis_data"]
+    INTENTS = data["intents"]
+    VOCAB = data["vocab"]
+    VOCAB_TOKENS = data["vocab_tokens"]
+    SUBSTRING_TRIE = data["substring_trie"]
+    DOA_INDEX = data["doa_index"]
+    HADIS_INDEX = data["hadis_index"]
+    DOA_POSTINGS = data["doa_postings"]
+    HADIS_POSTINGS = data["hadis_postings"]
+    HADIS_KW_POSTINGS = data["hadis_kw_postings"]
+    INTENT_PHRASES = data["intent_phrases"]
+    SUGGEST_BYTES, BROWSE_BYTES, HEALTH_BYTES = static
+    
+    _compute_chat_response.cache_clear()
+    with _EMPTY_QUERY_LOCK:
+        _EMPTY_QUERY_CACHE.clear()
+    
+    # Substring neighbours depend on the vocabulary; precompute them for it
+    containing_tokens.cache_clear()
+    partial_neighbors.cache_clear()
+    for token in VOCAB_TOKENS:
+        partial_neighbors(token)
+
+reload_datasets()
+
+# ================= HEALTH CHECK =================
+@app.route("/health", methods=["GET"])
+def health():
+    return json_bytes_response(HEALTH_BYTES)
 
 # ================= RUN =================
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for the chatbot backend (used by the Procfile).
+
+preload_app loads doa.py - datasets, stemmer dictionary and search
+indexes - once in the master before forking, so every worker shares
+those pages copy-on-write instead of building its own copy.
+
+Because the data lives in every worker, there is no reload endpoint:
+after changing the dataset files, restart the service. A HUP is not
+enough, since new workers are forked from the preloaded master.
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = 1
+preload_app = True
+
+
+def when_ready(server):
+    # Keep the preloaded objects out of GC scans so collections in the
+    # workers don't write to (and un-share) their pages
+    gc.freeze()